@@ -15,8 +15,12 @@ Example:
 
 import argparse
 import random
+from itertools import repeat
 from pathlib import Path
-from typing import Iterable, TextIO
+from typing import BinaryIO, Iterable, TextIO
+
+LP_CHUNK_BYTES = 1 << 22
+SMT2_BUFFER_BYTES = 1 << 20
 
 
 def item_sizes(n: int, capacity: int, classes: int, seed: int) -> list[int]:
@@ -28,35 +32,64 @@ def item_sizes(n: int, capacity: int, classes: int, seed: int) -> list[int]:
 
     print("half ", half, "left ", left, "values ", values)
 
+    # The draws stay on rng.choice so that a seed keeps producing the same
+    # instance; rng.choices(values, k=n) is faster but consumes the generator
+    # differently and would silently change every published instance. Mapping
+    # rng.choice at least avoids a generator frame per item.
     rng = random.Random(seed)
-    return sorted(rng.choice(values) for _ in range(n))
+    sizes = list(map(rng.choice, repeat(values, n)))
+    sizes.sort()
+    return sizes
 
 
-def x(i: int, j: int) -> str:
-    return f"x_{i}_{j}"
+def write_buffer(out: BinaryIO, buffer: bytearray) -> None:
+    """Write the whole buffer to an unbuffered file and empty it."""
+    with memoryview(buffer) as view:
+        written = 0
+        while written < len(view):
+            written += out.write(view[written:])
+    buffer.clear()
 
 
-def y(j: int) -> str:
-    return f"y_{j}"
+def flush_chunk(out: BinaryIO, buffer: bytearray) -> None:
+    """Write the buffer once it has grown past LP_CHUNK_BYTES."""
+    if len(buffer) >= LP_CHUNK_BYTES:
+        write_buffer(out, buffer)
 
 
-def write_lp(out: TextIO, sizes: list[int], capacity: int) -> None:
+def write_lp(out: BinaryIO, sizes: list[int], capacity: int) -> None:
     """Write a MILP model in CPLEX LP format."""
     n = len(sizes)
-    out.write(f"\\ Bin Packing MILP; B={capacity}, n={n}, sizes={sizes}\n\n")
-    out.write("Minimize\n obj: " + " + ".join(y(j) for j in range(n)) + "\n\n")
-    out.write("Subject To\n")
+    header = b"\\ Bin Packing MILP; B=%d, n=%d, sizes=%b\n\n" % (capacity, n, str(sizes).encode())
+    buffer = bytearray(header)
+    buffer += b"Minimize\n obj: " + b" + ".join(b"y_%d" % j for j in range(n)) + b"\n\n"
+    buffer += b"Subject To\n"
 
+    # Each row joins its shared x_<i>_ prefix or _<j> suffix over terms formatted once.
+    columns = [b"%d" % j for j in range(n)]
     for i in range(n):
-        out.write(f" assign_{i}: " + " + ".join(x(i, j) for j in range(n)) + " = 1\n")
+        prefix = b"x_%d_" % i
+        buffer += b" assign_%d: " % i
+        buffer += prefix + (b" + " + prefix).join(columns)
+        buffer += b" = 1\n"
+        flush_chunk(out, buffer)
+    coefficients = [b"%d x_%d" % (size, i) for i, size in enumerate(sizes)]
     for j in range(n):
-        terms = " + ".join(f"{size} {x(i, j)}" for i, size in enumerate(sizes))
-        out.write(f" cap_{j}: {terms} - {capacity} {y(j)} <= 0\n")
-
-    out.write("\nBinary\n")
-    out.writelines(f" {y(j)}\n" for j in range(n))
-    out.writelines(f" {x(i, j)}\n" for i in range(n) for j in range(n))
-    out.write("End\n")
+        suffix = b"_%d" % j
+        buffer += b" cap_%d: " % j
+        buffer += (suffix + b" + ").join(coefficients) + suffix
+        buffer += b" - %d y_%d <= 0\n" % (capacity, j)
+        flush_chunk(out, buffer)
+
+    endings = [column + b"\n" for column in columns]
+    buffer += b"\nBinary\n"
+    buffer += b"".join(b" y_" + ending for ending in endings)
+    for i in range(n):
+        prefix = b" x_%d_" % i
+        buffer += prefix + prefix.join(endings)
+        flush_chunk(out, buffer)
+    buffer += b"End\n"
+    write_buffer(out, buffer)
 
 
 def smt_sum(terms: Iterable[str]) -> str:
@@ -69,32 +102,38 @@ def smt_sum(terms: Iterable[str]) -> str:
 def write_smt2(out: TextIO, sizes: list[int], capacity: int) -> None:
     """Write an optimization model in SMT-LIB2 using integer 0/1 variables."""
     n = len(sizes)
+    columns = range(n)
     out.write(f"; Bin Packing Optimization; B={capacity}, n={n}, sizes={sizes}\n\n")
     #out.write("(set-logic QF_LIA)\n(set-option :produce-models true)\n\n")
 
-    out.writelines(f"(declare-const {y(j)} Int)\n" for j in range(n))
-    out.writelines(f"(declare-const {x(i, j)} Int)\n" for i in range(n) for j in range(n))
+    out.writelines(map("(declare-const y_{0} Int)\n".format, columns))
+    for i in range(n):
+        out.writelines(map(f"(declare-const x_{i}_{{0}} Int)\n".format, columns))
     out.write("\n")
 
-    out.writelines(f"(assert (or (= {y(j)} 0) (= {y(j)} 1)))\n" for j in range(n))
-    out.writelines(
-        f"(assert (or (= {x(i, j)} 0) (= {x(i, j)} 1)))\n"
-        for i in range(n)
-        for j in range(n)
-    )
+    out.writelines(map("(assert (or (= y_{0} 0) (= y_{0} 1)))\n".format, columns))
+    for i in range(n):
+        out.writelines(map(f"(assert (or (= x_{i}_{{0}} 0) (= x_{i}_{{0}} 1)))\n".format, columns))
     out.write("\n")
 
     for i in range(n):
-        out.write(f"(assert (= {smt_sum(x(i, j) for j in range(n))} 1))\n")
+        terms = map(f"x_{i}_{{}}".format, columns)
+        out.write(f"(assert (= {smt_sum(terms)} 1))\n")
     for j in range(n):
-        load = smt_sum(f"(* {size} {x(i, j)})" for i, size in enumerate(sizes))
-        out.write(f"(assert (<= {load} (* {capacity} {y(j)})))\n")
+        load = smt_sum(map(f"(* {{}} x_{{}}_{j})".format, sizes, columns))
+        out.write(f"(assert (<= {load} (* {capacity} y_{j})))\n")
 
-    out.write(f"\n(minimize {smt_sum(y(j) for j in range(n))})\n")
+    out.write(f"\n(minimize {smt_sum(map('y_{}'.format, columns))})\n")
     out.write("(check-sat)\n(get-objectives)\n(get-model)\n")
 
 
-WRITERS = {"lp": write_lp, "smt2": write_smt2}
+WRITERS = {
+    "lp": (write_lp, {"mode": "wb", "buffering": 0}),
+    "smt2": (
+        write_smt2,
+        {"mode": "w", "encoding": "utf-8", "newline": "\n", "buffering": SMT2_BUFFER_BYTES},
+    ),
+}
 
 
 def positive(name: str):
@@ -126,17 +165,27 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def main() -> None:
-    args = parse_args()
-    sizes = item_sizes(args.n, args.B, args.classes, args.seed)
+def generate_instance(n: int, capacity: int, classes: int, seed: int, outtype: str) -> Path:
+    """Write one instance to the working directory and return its path.
+
+    Batch drivers can import and call this directly instead of starting the
+    command-line tool once per instance.
+    """
+    sizes = item_sizes(n, capacity, classes, seed)
 
     output = Path(
-        f"hardness_halfcap_sorted_n{args.n}_B{args.B}_classes{args.classes}_seed{args.seed}.{args.outtype}"
+        f"hardness_halfcap_sorted_n{n}_B{capacity}_classes{classes}_seed{seed}.{outtype}"
     )
 
-    with output.open("w", encoding="utf-8", newline="\n") as file:
-        WRITERS[args.outtype](file, sizes, args.B)
+    writer, open_args = WRITERS[outtype]
+    with output.open(**open_args) as file:
+        writer(file, sizes, capacity)
+    return output
 
+
+def main() -> None:
+    args = parse_args()
+    output = generate_instance(args.n, args.B, args.classes, args.seed, args.outtype)
     print(f"Wrote: {output}")
 
 
@@ -11,8 +11,11 @@ from __future__ import annotations
 
 import argparse
 import csv
+import mmap
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Callable
 
@@ -36,29 +39,39 @@ CPLEX_SUMMARY = re.compile(
     r"Iterations\s*=\s*(\d+)\s*Nodes\s*=\s*(\d+)",
     re.IGNORECASE,
 )
-CPLEX_HEADER = re.compile(r"^\s*Node\s+Left.*\bGap\b", re.IGNORECASE)
-PERCENT = re.compile(r"([0-9]+(?:\.[0-9]+)?)%")
+CPLEX_HEADER = re.compile(r"^[^\S\n]*Node\s+Left.*\bGap\b", re.IGNORECASE | re.MULTILINE)
+# The first line of the node log that either ends it or reports a gap; the
+# gap group is empty when the log ends first.
+CPLEX_FIRST_GAP = re.compile(
+    r"^[^\S\n]*(?:Elapsed time|MIP -|Solution time|CPLEX>|.*?([0-9]+(?:\.[0-9]+)?)%)",
+    re.MULTILINE,
+)
 
 # Gurobi patterns
-GUROBI_TIME_LIMIT = re.compile(r"\bTime limit reached\b", re.IGNORECASE)
-GUROBI_OPTIMAL = re.compile(r"\bOptimal solution found\b", re.IGNORECASE)
+# Gurobi logs are ASCII, so they are matched as bytes straight from a memory map.
+GUROBI_TIME_LIMIT = re.compile(rb"\bTime limit reached\b", re.IGNORECASE)
+GUROBI_OPTIMAL = re.compile(rb"\bOptimal solution found\b", re.IGNORECASE)
 GUROBI_BEST = re.compile(
-    r"Best objective\s+([+-]?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?),\s*"
-    r"best bound\s+([+-]?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?),\s*"
-    r"gap\s+([0-9]*\.?[0-9]+)%",
+    rb"Best objective\s+([+-]?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?),\s*"
+    rb"best bound\s+([+-]?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?),\s*"
+    rb"gap\s+([0-9]*\.?[0-9]+)%",
     re.IGNORECASE,
 )
 GUROBI_EXPLORED = re.compile(
-    r"Explored\s+(\d+)\s+nodes?\s*\(\s*(\d+)\s+simplex iterations\s*\)\s*"
-    r"in\s+([0-9]*\.?[0-9]+)\s+seconds\s*\(\s*"
-    r"([0-9]*\.?[0-9]+)\s+work units\s*\)",
+    rb"Explored\s+(\d+)\s+nodes?\s*\(\s*(\d+)\s+simplex iterations\s*\)\s*"
+    rb"in\s+([0-9]*\.?[0-9]+)\s+seconds\s*\(\s*"
+    rb"([0-9]*\.?[0-9]+)\s+work units\s*\)",
     re.IGNORECASE,
 )
+# run_all_lp_with_Gurobi.sh appends the .sol file to the log after this line.
+GUROBI_SOLUTION_MARKER = b"\n===== SOLUTION"
 GUROBI_HEADER = re.compile(
-    r"Expl\s+Unexpl.*Incumbent\s+BestBd\s+Gap.*It/Node\s+Time", re.IGNORECASE
+    rb"Expl\s+Unexpl.*Incumbent\s+BestBd\s+Gap.*It/Node\s+Time", re.IGNORECASE
+)
+GUROBI_ROW = re.compile(
+    rb"^[^\S\n]*(?:H[^\S\n]+)?\d+[^\S\n]+\d+[^\S\n]+\S.*$", re.MULTILINE
 )
-GUROBI_ROW = re.compile(r"^(H\s+)?\d+\s+\d+\s+")
-GUROBI_PERCENT = re.compile(r"([0-9]*\.?[0-9]+%)")
+GUROBI_PERCENT = re.compile(rb"([0-9]*\.?[0-9]+%)")
 
 # SCIP patterns
 SCIP_STATUS = re.compile(r"^SCIP Status\s*:\s*(.*)$", re.IGNORECASE | re.MULTILINE)
@@ -105,9 +118,17 @@ def last_match(pattern: re.Pattern[str], text: str) -> str:
     return matches[-1].strip() if matches else ""
 
 
+def last_search(
+    pattern: re.Pattern[bytes], data: bytes | mmap.mmap, start: int, end: int
+) -> re.Match[bytes] | None:
+    match = None
+    for match in pattern.finditer(data, start, end):
+        pass
+    return match
+
+
 def parse_cplex(path: Path) -> dict[str, str]:
     text = read_text(path)
-    lines = text.splitlines()
 
     status = ""
     if CPLEX_TIME_LIMIT.search(text):
@@ -123,19 +144,11 @@ def parse_cplex(path: Path) -> dict[str, str]:
     summary_match = CPLEX_SUMMARY.search(text)
 
     initial_gap = ""
-    after_header = False
-    for line in lines:
-        if not after_header:
-            after_header = bool(CPLEX_HEADER.search(line))
-            continue
-        if not line.strip():
-            continue
-        if line.lstrip().startswith(("Elapsed time", "MIP -", "Solution time", "CPLEX>")):
-            break
-        match = PERCENT.search(line)
-        if match:
+    header = CPLEX_HEADER.search(text)
+    if header:
+        match = CPLEX_FIRST_GAP.search(text, header.end())
+        if match and match.group(1):
             initial_gap = f"{match.group(1)}%"
-            break
 
     return {
         "filename": path.name,
@@ -150,7 +163,16 @@ def parse_cplex(path: Path) -> dict[str, str]:
     }
 
 
-def parse_gurobi(path: Path) -> dict[str, str]:
+def find_gurobi_summary(data: bytes | mmap.mmap, end: int) -> int:
+    """Return where the last Explored line before end starts, or 0 if there is none."""
+    position = end
+    while (position := data.rfind(b"Explored", 0, position)) != -1:
+        if GUROBI_EXPLORED.match(data, position, end):
+            return position
+    return 0
+
+
+def gurobi_fields(data: bytes | mmap.mmap) -> dict[str, str]:
     status = ""
     objective = ""
     gap = ""
@@ -159,36 +181,47 @@ def parse_gurobi(path: Path) -> dict[str, str]:
     initial_gap = ""
     simplex_iters = ""
     nodes = ""
-    after_header = False
-
-    for line in read_text(path).splitlines():
-        if status != "Time limit reached":
-            if GUROBI_TIME_LIMIT.search(line):
-                status = "Time limit reached"
-            elif not status and GUROBI_OPTIMAL.search(line):
-                status = "Optimal solution found"
-
-        match = GUROBI_BEST.search(line)
-        if match:
-            gap_value = match.group(3)
-            gap = f"{gap_value}%"
-            objective = match.group(1) if gap_value == "0.0000" else ""
-
-        match = GUROBI_EXPLORED.search(line)
-        if match:
-            nodes, simplex_iters, runtime, work_units = match.groups()
-
-        if not initial_gap:
-            if not after_header:
-                after_header = bool(GUROBI_HEADER.search(line))
-            else:
-                stripped = line.strip()
-                if stripped and GUROBI_ROW.match(stripped):
-                    percentages = GUROBI_PERCENT.findall(stripped)
-                    initial_gap = percentages[-1] if percentages else ""
+
+    # Like read_text, NUL bytes (e.g. padding left by a crashed run) are dropped
+    # before matching; only logs that contain them are copied out of the map.
+    if data.find(b"\x00") != -1:
+        data = data[:].replace(b"\x00", b"")
+
+    log_end = data.rfind(GUROBI_SOLUTION_MARKER)
+    if log_end == -1:
+        log_end = len(data)
+    # The status and final bound follow the last Explored line, so all summary
+    # fields are read from there on; a log without one (e.g. an aborted run) is
+    # searched from the start.
+    summary_start = find_gurobi_summary(data, log_end)
+
+    if GUROBI_TIME_LIMIT.search(data, summary_start, log_end):
+        status = "Time limit reached"
+    elif GUROBI_OPTIMAL.search(data, summary_start, log_end):
+        status = "Optimal solution found"
+
+    best = last_search(GUROBI_BEST, data, summary_start, log_end)
+    if best:
+        gap_value = best.group(3).decode()
+        gap = f"{gap_value}%"
+        objective = best.group(1).decode() if gap_value == "0.0000" else ""
+
+    explored = last_search(GUROBI_EXPLORED, data, summary_start, log_end)
+    if explored:
+        nodes, simplex_iters, runtime, work_units = (
+            value.decode() for value in explored.groups()
+        )
+
+    # The initial gap is taken from the first progress row that reports one.
+    header = GUROBI_HEADER.search(data, 0, log_end)
+    if header:
+        for row in GUROBI_ROW.finditer(data, header.end(), log_end):
+            percentages = GUROBI_PERCENT.findall(row.group())
+            if percentages:
+                initial_gap = percentages[-1].decode()
+                break
 
     return {
-        "filename": path.name,
         "status": status,
         "objective": objective,
         "gap": gap,
@@ -200,6 +233,15 @@ def parse_gurobi(path: Path) -> dict[str, str]:
     }
 
 
+def parse_gurobi(path: Path) -> dict[str, str]:
+    """Parse a Gurobi log through a read-only memory map instead of decoding it."""
+    with path.open("rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return {"filename": path.name, **gurobi_fields(b"")}
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return {"filename": path.name, **gurobi_fields(data)}
+
+
 def parse_scip(path: Path) -> dict[str, str]:
     text = read_text(path)
     status = first_match(SCIP_STATUS, text) or "unknown"
@@ -296,7 +338,13 @@ def collect_out_files(in_path: Path) -> list[Path]:
         return [in_path]
     if not in_path.is_dir():
         raise FileNotFoundError(f"input path does not exist: {in_path}")
-    return sorted(path for path in in_path.glob("*.out") if path.is_file())
+    # os.scandir yields the file type with each entry, avoiding a Path object
+    # and a stat call per directory entry.
+    with os.scandir(in_path) as entries:
+        names = sorted(
+            entry.name for entry in entries if entry.name.endswith(".out") and entry.is_file()
+        )
+    return [in_path / name for name in names]
 
 
 def main() -> None:
@@ -309,11 +357,21 @@ def main() -> None:
     if not files:
         raise SystemExit(f"Error: no .out files found in: {in_path}")
 
+    # Logs are independent, so they are parsed in worker processes; map keeps
+    # the rows in the sorted file order.
+    if len(files) > 1:
+        workers = os.cpu_count() or 1
+        chunksize = max(1, min(32, len(files) // (4 * workers)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(parser, files, chunksize=chunksize))
+    else:
+        rows = [parser(path) for path in files]
+
     out_csv.parent.mkdir(parents=True, exist_ok=True)
     with out_csv.open("w", newline="", encoding="utf-8") as file:
         writer = csv.DictWriter(file, fieldnames=fieldnames)
         writer.writeheader()
-        writer.writerows(parser(path) for path in files)
+        writer.writerows(rows)
 
     print(f"Wrote {len(files)} row(s) to {out_csv}")
 
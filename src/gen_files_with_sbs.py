@@ -31,7 +31,7 @@ import os
 import re
 import sys
 from pathlib import Path
-from typing import Dict, Iterable, List, Sequence, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Set, Tuple
 
 
 CANONICAL_KEYS = {
@@ -56,6 +56,7 @@ LP_SECTION_HEADERS = {
     "end",
 }
 LP_CONSTRAINT_HEADERS = {"subject to", "such that", "st", "s.t."}
+LP_SBS_SKIPPED_HEADERS = LP_CONSTRAINT_HEADERS | {"end", "binary", "binaries"}
 SMT2_TERMINAL_PREFIXES = (
     "(check-sat",
     "(check-sat-assuming",
@@ -83,11 +84,6 @@ MINIMIZE_Y_OBJECTIVE_RE = re.compile(
     re.IGNORECASE,
 )
 
-def normalize_smt2_line(line: str) -> str:
-    """Normalize whitespace and case for matching complete SMT-LIB commands."""
-    return re.sub(r"\s+", " ", line.strip()).lower()
-
-
 def find_target_objective(lines: Sequence[str]) -> int:
     matches = [
         index
@@ -206,54 +202,28 @@ def lp_header(line: str) -> str:
     return re.sub(r"\s+", " ", line.strip().lower())
 
 
-def find_lp_end(lines: Sequence[str]) -> int:
-    for index, line in enumerate(lines):
-        if lp_header(line) == "end":
-            return index
-    raise ValueError("LP base model does not contain an 'End' line.")
-
-
-def find_lp_constraint_insertion(lines: Sequence[str]) -> int:
-    """Return the first post-constraint section, or End as a fallback."""
-    end_index = find_lp_end(lines)
-    for index, line in enumerate(lines[: end_index + 1]):
-        if lp_header(line) in LP_SECTION_HEADERS:
-            return index
-    return end_index
-
+def lp_header_line(headers: Iterable[str]) -> re.Pattern[str]:
+    """Match a whole line consisting of one of the given LP section headers."""
+    alternatives = "|".join(re.escape(header) for header in sorted(headers))
+    return re.compile(
+        rf"^[^\S\n]*(?:{alternatives})[^\S\n]*$", re.IGNORECASE | re.MULTILINE
+    )
 
-def find_lp_binary_section(lines: Sequence[str]) -> Tuple[int, int]:
-    """Return [start, end) of the Binary/Binaries variable section."""
-    end_index = find_lp_end(lines)
-    binary_index = -1
-    for index, line in enumerate(lines[:end_index]):
-        if lp_header(line) in {"binary", "binaries"}:
-            binary_index = index
-            break
-    if binary_index == -1:
-        return -1, -1
 
-    section_end = end_index
-    for index in range(binary_index + 1, end_index):
-        if lp_header(lines[index]) in LP_SECTION_HEADERS:
-            section_end = index
-            break
-    return binary_index, section_end
+LP_SECTION_RE = lp_header_line(LP_SECTION_HEADERS)
+LP_BINARY_RE = lp_header_line({"binary", "binaries"})
+LP_END_RE = lp_header_line({"end"})
 
 
-def clean_lp_constraints(text: str) -> List[str]:
-    result: List[str] = []
-    for raw_line in text.splitlines():
-        stripped = raw_line.strip()
-        normalized = lp_header(raw_line)
-        if not stripped or stripped.startswith("\\"):
-            continue
-        if normalized in LP_CONSTRAINT_HEADERS or normalized == "end":
-            continue
-        if normalized in {"binary", "binaries"}:
-            continue
-        result.append(raw_line.rstrip())
-    return result
+def lp_constraint_block(text: str) -> str:
+    """Return the SBS constraint lines, minus blanks, comments and headers."""
+    return "".join(
+        f"{raw_line.rstrip()}\n"
+        for raw_line in text.splitlines()
+        if (stripped := raw_line.strip())
+        and not stripped.startswith("\\")
+        and lp_header(stripped) not in LP_SBS_SKIPPED_HEADERS
+    )
 
 
 def clean_lp_variables(text: str) -> List[str]:
@@ -269,44 +239,81 @@ def clean_lp_variables(text: str) -> List[str]:
     return unique_preserving_order(variables)
 
 
-def existing_lp_binary_variables(lines: Sequence[str]) -> List[str]:
-    binary_start, binary_end = find_lp_binary_section(lines)
-    if binary_start == -1:
-        return []
-    variables: List[str] = []
-    for line in lines[binary_start + 1 : binary_end]:
-        variables.extend(line.strip().split())
-    return variables
+class LpBase(NamedTuple):
+    """An LP base model split at the points where SBS content is inserted."""
 
+    head: str
+    middle: str
+    tail: str
+    binaries: Set[str]
+    has_binary_section: bool
 
-def merge_lp(
-    base_text: str,
-    constraints_text: str,
-    variables_text: str | None = None,
-) -> str:
-    lines = base_text.splitlines()
-    if not lines:
+
+def split_lp_base(base_text: str) -> LpBase:
+    """Split the base once so each SBS file only adds its own lines around it.
+
+    Section headers are located with multi-line regular expressions, so the
+    base model is never broken up into a list of lines.
+    """
+    if not base_text:
         raise ValueError("The LP base model is empty.")
+    if "\r" in base_text:
+        # Output uses "\n" line endings, as when the base was split into lines.
+        base_text = "\n".join(base_text.splitlines())
+
+    end = LP_END_RE.search(base_text)
+    if not end:
+        raise ValueError("LP base model does not contain an 'End' line.")
+    # End is itself a section header, so this always finds a line at or before it.
+    insertion = LP_SECTION_RE.search(base_text).start()
+
+    binaries: Set[str] = set()
+    variables_at = end.start()
+    binary = LP_BINARY_RE.search(base_text, insertion, end.start())
+    if binary:
+        section = LP_SECTION_RE.search(base_text, binary.end(), end.start())
+        if section:
+            variables_at = section.start()
+        binaries.update(base_text[binary.end() : variables_at].split())
+
+    return LpBase(
+        head=base_text[:insertion],
+        middle=base_text[insertion:variables_at],
+        tail=base_text[variables_at:].rstrip() + "\n",
+        binaries=binaries,
+        has_binary_section=binary is not None,
+    )
 
-    constraints = clean_lp_constraints(constraints_text)
-    variables = clean_lp_variables(variables_text or "")
 
-    insertion = find_lp_constraint_insertion(lines)
-    constraint_block = constraints + ([""] if constraints else [])
-    merged = list(lines[:insertion]) + constraint_block + list(lines[insertion:])
+def lp_segments(
+    base: LpBase,
+    constraints_text: str,
+    variables_text: str | None = None,
+) -> List[str]:
+    constraint_block = lp_constraint_block(constraints_text)
+    variables = [
+        name
+        for name in clean_lp_variables(variables_text or "")
+        if name not in base.binaries
+    ]
+    if variables and not base.has_binary_section:
+        variables.insert(0, "Binary")
 
-    if variables:
-        existing = set(existing_lp_binary_variables(merged))
-        variables_to_add = [name for name in variables if name not in existing]
-        if variables_to_add:
-            binary_start, binary_end = find_lp_binary_section(merged)
-            if binary_start != -1:
-                merged[binary_end:binary_end] = variables_to_add
-            else:
-                end_index = find_lp_end(merged)
-                merged[end_index:end_index] = ["Binary", *variables_to_add]
+    return [
+        base.head,
+        (constraint_block + "\n") if constraint_block else "",
+        base.middle,
+        "".join(f"{name}\n" for name in variables),
+        base.tail,
+    ]
 
-    return "\n".join(merged).rstrip() + "\n"
+
+def merge_lp(
+    base_text: str,
+    constraints_text: str,
+    variables_text: str | None = None,
+) -> str:
+    return "".join(lp_segments(split_lp_base(base_text), constraints_text, variables_text))
 
 
 # ---------------------------------------------------------------------------
@@ -443,15 +450,24 @@ def merge_omt(
 # ---------------------------------------------------------------------------
 
 
+def list_sbs_files(sbs_dir: Path) -> List[Path]:
+    """Return the visible regular files of sbs_dir, sorted by name."""
+    with os.scandir(sbs_dir) as entries:
+        names = sorted(
+            entry.name
+            for entry in entries
+            if not entry.name.startswith(".") and entry.is_file()
+        )
+    return [sbs_dir / name for name in names]
+
+
 def find_linear_pairs(sbs_dir: Path, extension: str) -> List[Tuple[str, Path, Path]]:
     constraints_suffix = f"_constraints.{extension}"
     variables_suffix = f"_new_variables.{extension}"
     constraints: Dict[str, Path] = {}
     variables: Dict[str, Path] = {}
 
-    for path in sorted(sbs_dir.iterdir()):
-        if not path.is_file() or path.name.startswith("."):
-            continue
+    for path in list_sbs_files(sbs_dir):
         if path.name.endswith(constraints_suffix):
             key = path.name[: -len(constraints_suffix)]
             constraints[key] = path
@@ -466,26 +482,36 @@ def find_linear_pairs(sbs_dir: Path, extension: str) -> List[Tuple[str, Path, Pa
 def find_quadratic_snippets(sbs_dir: Path, extension: str) -> List[Path]:
     return [
         path
-        for path in sorted(sbs_dir.iterdir())
-        if path.is_file()
-        and not path.name.startswith(".")
-        and path.suffix.lower() == f".{extension}"
+        for path in list_sbs_files(sbs_dir)
+        if path.suffix.lower() == f".{extension}"
         and f"_constraints.{extension}" not in path.name
         and f"_new_variables.{extension}" not in path.name
     ]
 
 
+def prepare_base(base_type: str, base_text: str) -> LpBase | str:
+    if base_type == "lp":
+        return split_lp_base(base_text)
+    return base_text
+
+
 def merge_model(
     base_type: str,
-    base_text: str,
+    base: LpBase | str,
     constraints_text: str,
     variables_text: str | None = None,
-) -> str:
+) -> List[str]:
+    """Return the merged model as a list of text segments to be written in order."""
     if base_type == "lp":
-        return merge_lp(base_text, constraints_text, variables_text)
+        return lp_segments(base, constraints_text, variables_text)
     if base_type == "smt2":
-        return merge_smt2(base_text, constraints_text, variables_text)
-    return merge_omt(base_text, constraints_text, variables_text)
+        return [merge_smt2(base, constraints_text, variables_text)]
+    return [merge_omt(base, constraints_text, variables_text)]
+
+
+def write_segments(path: Path, segments: Iterable[str]) -> None:
+    with path.open("w", encoding="utf-8") as out:
+        out.writelines(segments)
 
 
 def generate(
@@ -521,7 +547,7 @@ def generate(
     output_extension = sbs_extension
 
     output_dir.mkdir(parents=True, exist_ok=True)
-    base_text = read_text(base_file)
+    base = prepare_base(base_type, read_text(base_file))
     generated: List[Path] = []
 
     if sbs_type == "linear":
@@ -536,12 +562,12 @@ def generate(
         for pair_name, constraints_file, variables_file in pairs:
             merged = merge_model(
                 base_type,
-                base_text,
+                base,
                 read_text(constraints_file),
                 read_text(variables_file),
             )
             output_path = output_dir / f"{base_file.stem}__{pair_name}.{output_extension}"
-            output_path.write_text(merged, encoding="utf-8")
+            write_segments(output_path, merged)
             generated.append(output_path)
             print(f"Wrote: {output_path}")
     else:
@@ -550,9 +576,9 @@ def generate(
             raise SystemExit(f"Error: no sbs snippet files found in: {sbs_dir}")
 
         for snippet_file in snippets:
-            merged = merge_model(base_type, base_text, read_text(snippet_file))
+            merged = merge_model(base_type, base, read_text(snippet_file))
             output_path = output_dir / f"{snippet_file.stem}.{output_extension}"
-            output_path.write_text(merged, encoding="utf-8")
+            write_segments(output_path, merged)
             generated.append(output_path)
             print(f"Wrote: {output_path}")
 